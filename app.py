@@ -1,8 +1,232 @@
 import streamlit as st
 import tempfile
+import io
 import os
-from generate_labels import generate_labels_and_summary, load_and_normalize_data
-from label_sorter import sort_tiktok_labels
+import threading
+from result_cache import LRUCache, make_key, result_size
+
+# generate_labels / label_sorter pull in pandas, ReportLab and PyPDF2, so they
+# are imported inside the branches that need them to keep the first paint fast.
+
+
+def _preload_pdf_engine():
+    from generate_labels import warm_up_fonts
+    from tiktok_pipeline import warm_up_pool
+    import label_sorter  # noqa: F401
+    warm_up_fonts()
+    warm_up_pool()
+
+
+@st.cache_resource
+def start_pdf_engine_preload():
+    """Import the PDF stack in the background once per server process."""
+    thread = threading.Thread(target=_preload_pdf_engine, name="pdf-engine-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def detect_format(excel_bytes):
+    """
+    Detect the file format and run the pre-flight validation once per
+    uploaded file instead of on every rerun.
+    """
+    from generate_labels import load_and_normalize_data
+    from order_validation import validate_orders
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
+        tmp.write(excel_bytes)
+        tmp_path = tmp.name
+    try:
+        df, detection_stats = load_and_normalize_data(tmp_path)
+    finally:
+        os.unlink(tmp_path)
+    return detection_stats.get('format_detected', 'Unknown'), validate_orders(df)
+
+
+@st.cache_resource
+def get_result_cache():
+    """Finished PDFs shared by all sessions, so reruns and repeat downloads are instant."""
+    return LRUCache(max_bytes=256 * 1024 * 1024, size=result_size)
+
+
+@st.cache_resource
+def get_label_archive():
+    """Reprint archive of every sorted or generated PDF (see label_archive)."""
+    from label_archive import LabelArchive
+    return LabelArchive()
+
+
+@st.cache_resource
+def get_archive_worker():
+    """Single background thread that writes to the archive, so runs don't wait on it."""
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix='label-archive')
+
+
+def _archive_pdf(archive, pdf_data, stats, kind):
+    try:
+        archive.add_pdf(pdf_data, stats['page_ids'], kind, stats.get('format_detected'))
+    except Exception as e:
+        print(f"Could not archive {kind} labels: {e}")
+
+
+def archive_output(pdf_data, stats, kind):
+    """Queue a finished PDF for the reprint archive; never fail the run because of it."""
+    try:
+        # Created here in the script thread; the worker has no ScriptRunContext
+        archive = get_label_archive()
+        get_archive_worker().submit(_archive_pdf, archive, pdf_data, stats, kind)
+    except Exception as e:
+        print(f"Could not archive {kind} labels: {e}")
+
+
+def generate_labels_cached(excel_bytes, excel_path):
+    """generate_labels_and_summary through the result cache. Returns (pdf_bytes, stats)."""
+    key = make_key('labels', excel_bytes)
+    cached = get_result_cache().get(key)
+    if cached is not None:
+        return cached
+
+    from generate_labels import generate_labels_and_summary
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_output:
+        tmp_output_path = tmp_output.name
+    try:
+        stats = generate_labels_and_summary(excel_path, tmp_output_path)
+        with open(tmp_output_path, 'rb') as f:
+            pdf_data = f.read()
+        archive_output(pdf_data, stats, 'generated')
+    finally:
+        if os.path.exists(tmp_output_path): os.unlink(tmp_output_path)
+
+    get_result_cache().put(key, (pdf_data, stats))
+    return pdf_data, stats
+
+
+def sort_labels_cached(excel_bytes, excel_path, pdf_bytes):
+    """sort_labels through the result cache. Returns (pdf_bytes or None, stats)."""
+    key = make_key('sort', excel_bytes, pdf_bytes)
+    cached = get_result_cache().get(key)
+    if cached is not None:
+        return cached
+
+    from label_sorter import sort_labels
+
+    # Save PDF
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
+        tmp_pdf.write(pdf_bytes)
+        tmp_pdf_path = tmp_pdf.name
+    
+    # Output
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_output:
+        tmp_output_path = tmp_output.name
+
+    try:
+        sort_stats = sort_labels(excel_path, tmp_pdf_path, tmp_output_path)
+        pdf_data = None
+        if sort_stats['success']:
+            with open(tmp_output_path, 'rb') as f:
+                pdf_data = f.read()
+            archive_output(pdf_data, sort_stats, 'sorted')
+    finally:
+        for path in (tmp_pdf_path, tmp_output_path):
+            if os.path.exists(path): os.unlink(path)
+
+    # Only successful results are kept; errors are retried on the next run
+    if sort_stats['success']:
+        get_result_cache().put(key, (pdf_data, sort_stats))
+    return pdf_data, sort_stats
+
+
+def process_tiktok_cached(excel_bytes, excel_path, pdf_bytes):
+    """
+    Sort the TikTok labels and generate the picking list in one combined run
+    (see tiktok_pipeline), unless one of the results is already cached.
+
+    Returns:
+        ((sorted_pdf, sort_stats), (summary_pdf, summary_stats) or None, summary_error)
+    """
+    sort_key = make_key('sort', excel_bytes, pdf_bytes)
+    labels_key = make_key('labels', excel_bytes)
+    sorted_result = get_result_cache().get(sort_key)
+    labels_result = get_result_cache().get(labels_key)
+
+    if sorted_result is not None or labels_result is not None:
+        # Only one step is missing, run it on its own
+        summary_error = None
+        if sorted_result is None:
+            sorted_result = sort_labels_cached(excel_bytes, excel_path, pdf_bytes)
+        if labels_result is None:
+            try:
+                labels_result = generate_labels_cached(excel_bytes, excel_path)
+            except Exception as e:
+                summary_error = str(e)
+        return sorted_result, labels_result, summary_error
+
+    from tiktok_pipeline import process_tiktok_orders
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
+        tmp_pdf.write(pdf_bytes)
+        tmp_pdf_path = tmp_pdf.name
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_sorted:
+        tmp_sorted_path = tmp_sorted.name
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_summary:
+        tmp_summary_path = tmp_summary.name
+
+    try:
+        result = process_tiktok_orders(excel_path, tmp_pdf_path, tmp_sorted_path, tmp_summary_path)
+
+        sort_stats = result['sort_stats']
+        sorted_pdf = None
+        if sort_stats['success']:
+            with open(tmp_sorted_path, 'rb') as f:
+                sorted_pdf = f.read()
+            get_result_cache().put(sort_key, (sorted_pdf, sort_stats))
+            archive_output(sorted_pdf, sort_stats, 'sorted')
+
+        labels_result = None
+        if result['summary_stats'] is not None:
+            with open(tmp_summary_path, 'rb') as f:
+                labels_result = (f.read(), result['summary_stats'])
+            get_result_cache().put(labels_key, labels_result)
+            archive_output(labels_result[0], result['summary_stats'], 'generated')
+    finally:
+        for path in (tmp_pdf_path, tmp_sorted_path, tmp_summary_path):
+            if os.path.exists(path): os.unlink(path)
+
+    return (sorted_pdf, sort_stats), labels_result, result['summary_error']
+
+
+def show_sort_result(pdf_data, sort_stats, download_name):
+    """Show label sorting stats and offer the sorted PDF for download."""
+    # Check result
+    if sort_stats['success']:
+        st.success(f"Sorted labels for {sort_stats['matched_ids_count']} / {sort_stats['total_excel_ids']} orders.")
+        
+        if sort_stats['missing_ids']:
+            with st.expander(f"⚠️ Missing Labels for {len(sort_stats['missing_ids'])} Orders"):
+                st.write("The following tracking IDs were in Excel but not found in PDF:")
+                st.write(sort_stats['missing_ids'])
+        
+        dropped_sorted = [nid for nid in sort_stats.get('dropped_row_ids', []) if nid not in sort_stats['missing_ids']]
+        if dropped_sorted:
+            with st.expander(f"ℹ️ {len(dropped_sorted)} Labels for Rows Dropped From the Picking List"):
+                st.write("These labels were sorted, but their rows were dropped (invalid quantity or missing SKU):")
+                st.write(dropped_sorted)
+
+        if sort_stats['unmatched_pages'] > 0:
+            st.info(f"{sort_stats['unmatched_pages']} pages in the PDF were not matched to any order (likely extra pages).")
+
+        st.download_button(
+            label="Download Sorted Labels",
+            data=pdf_data,
+            file_name=download_name,
+            mime="application/pdf"
+        )
+    else:
+        st.error(f"Error sorting labels: {sort_stats['error']}")
+
 
 # Page Configuration
 st.set_page_config(
@@ -165,12 +389,28 @@ with col2:
 
         try:
             # Detect Format
-            _, detection_stats = load_and_normalize_data(tmp_input_path) 
-            format_type = detection_stats.get('format_detected', 'Unknown')
+            format_type, validation = detect_format(uploaded_file.getvalue())
         except Exception as e:
             format_type = 'Error'
+            validation = None
             st.error(f"Error detecting file format: {str(e)}")
 
+        if validation and (validation['errors'] or validation['warnings']):
+            with st.expander("⚠️ Pre-flight Validation", expanded=not validation['valid']):
+                for error in validation['errors']:
+                    st.error(error)
+                for warning in validation['warnings']:
+                    st.warning(warning)
+                if validation['duplicate_tracking_ids']:
+                    st.write("Tracking IDs shared by different orders:")
+                    st.write(validation['duplicate_tracking_ids'])
+                if validation['invalid_quantity_orders']:
+                    st.write("Orders with invalid quantities:")
+                    st.write(validation['invalid_quantity_orders'])
+                if validation['short_tracking_ids']:
+                    st.write("Tracking IDs too short to match labels:")
+                    st.write(validation['short_tracking_ids'])
+
         if format_type == 'TikTok':
             st.info("✅ TikTok Orders Detected")
             st.markdown("### Step 2: Upload Labels PDF")
@@ -183,94 +423,43 @@ with col2:
             )
             
             if pdf_file:
-                with st.spinner('Sorting labels...'):
-                    # Save PDF
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                        tmp_pdf.write(pdf_file.getbuffer())
-                        tmp_pdf_path = tmp_pdf.name
-                    
-                    # Output
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_output:
-                        tmp_output_path = tmp_output.name
-
-                    # Sort
-                    sort_stats = sort_tiktok_labels(tmp_input_path, tmp_pdf_path, tmp_output_path)
-                    
-                    # Check result
-                    if sort_stats['success']:
-                        st.success(f"Sorted labels for {sort_stats['matched_ids_count']} / {sort_stats['total_excel_ids']} orders.")
-                        
-                        if sort_stats['missing_ids']:
-                            with st.expander(f"⚠️ Missing Labels for {len(sort_stats['missing_ids'])} Orders"):
-                                st.write("The following Tracking IDs were in Excel but not found in PDF:")
-                                st.write(sort_stats['missing_ids'])
-                        
-                        if sort_stats['unmatched_pages'] > 0:
-                            st.info(f"{sort_stats['unmatched_pages']} pages in the PDF were not matched to any order (likely extra pages).")
-
-                        # Read and Download
-                        with open(tmp_output_path, 'rb') as f:
-                            pdf_data = f.read()
-                            
-                        st.download_button(
-                            label="Download Sorted Labels",
-                            data=pdf_data,
-                            file_name="etiquetas_tiktok_ordenadas.pdf",
-                            mime="application/pdf"
+                # Sorting and the picking list (Step 3) run together on one parsed file
+                with st.spinner('Sorting labels and generating picking list...'):
+                    try:
+                        sorted_result, labels_result, summary_error = process_tiktok_cached(
+                            uploaded_file.getvalue(), tmp_input_path, pdf_file.getvalue()
                         )
-                    else:
-                        st.error(f"Error sorting labels: {sort_stats['error']}")
-                    
-                    if os.path.exists(tmp_output_path): os.unlink(tmp_output_path)
+                    except Exception as e:
+                        sorted_result = (None, {'success': False, 'error': str(e)})
+                        labels_result, summary_error = None, str(e)
+
+                show_sort_result(*sorted_result, "etiquetas_tiktok_ordenadas.pdf")
 
                 st.markdown("<hr>", unsafe_allow_html=True)
                 st.markdown("### Step 3: Picking List & Summary")
                 
-                # Also generate the standard summary/labels PDF for TikTok (picking list)
-                with st.spinner('Generating picking list...'):
-                    try:
-                        # Output file for generated summary
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_gen_output:
-                            tmp_gen_output_path = tmp_gen_output.name
-                        
-                        # Generate (using existing logic which handles TikTok format)
-                        gen_stats = generate_labels_and_summary(tmp_input_path, tmp_gen_output_path)
-                        
-                        # Read PDF
-                        with open(tmp_gen_output_path, 'rb') as gen_pdf_file:
-                            gen_pdf_data = gen_pdf_file.read()
-                            
-                        # Success State
-                        st.success(f"Generated picking list for {gen_stats['unique_orders']} orders.")
-                        
-                        # Download Action
-                        st.download_button(
-                            label="Download Picking List & Summary",
-                            data=gen_pdf_data,
-                            file_name="etiquetas_tiktok_resumen.pdf",
-                            mime="application/pdf"
-                        )
+                if labels_result is not None:
+                    gen_pdf_data, gen_stats = labels_result
                         
-                        if os.path.exists(tmp_gen_output_path):
-                            os.unlink(tmp_gen_output_path)
-                            
-                    except Exception as e:
-                        st.warning(f"Could not generate picking list summary: {str(e)}")
+                    # Success State
+                    st.success(f"Generated picking list for {gen_stats['unique_orders']} orders.")
+                    
+                    # Download Action
+                    st.download_button(
+                        label="Download Picking List & Summary",
+                        data=gen_pdf_data,
+                        file_name="etiquetas_tiktok_resumen.pdf",
+                        mime="application/pdf"
+                    )
+                else:
+                    st.warning(f"Could not generate picking list summary: {summary_error}")
 
         elif format_type == 'Shein':
             # Processing Shein (Existing Logic)
             with st.spinner('Processing Shein orders...'):
                 try:
-                    # Output file
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_output:
-                        tmp_output_path = tmp_output.name
-                    
                     # Generate
-                    stats = generate_labels_and_summary(tmp_input_path, tmp_output_path)
-                    
-                    # Read PDF
-                    with open(tmp_output_path, 'rb') as pdf_file:
-                        pdf_data = pdf_file.read()
+                    pdf_data, stats = generate_labels_cached(uploaded_file.getvalue(), tmp_input_path)
                     
                     # Success State
                     st.success(f"Processed {stats['valid_rows']} valid orders from {uploaded_file.name}")
@@ -300,12 +489,26 @@ with col2:
                         file_name="etiquetas_shein_procesadas.pdf",
                         mime="application/pdf"
                     )
-                    
-                    if os.path.exists(tmp_output_path):
-                        os.unlink(tmp_output_path)
                         
                 except Exception as e:
                     st.error(f"Error processing Shein file: {str(e)}")
+
+            st.markdown("<hr>", unsafe_allow_html=True)
+            st.markdown("### Optional: Sort Carrier Labels")
+            st.markdown("Upload the carrier labels PDF to sort it by `Número de guía` in pick order.")
+
+            shein_pdf_file = st.file_uploader(
+                "Upload Labels PDF",
+                type=['pdf'],
+                key='shein_pdf'
+            )
+
+            if shein_pdf_file:
+                with st.spinner('Sorting labels...'):
+                    sorted_pdf, sort_stats = sort_labels_cached(
+                        uploaded_file.getvalue(), tmp_input_path, shein_pdf_file.getvalue()
+                    )
+                show_sort_result(sorted_pdf, sort_stats, "etiquetas_shein_ordenadas.pdf")
         
         else:
             st.error("Could not recognize file format. Please ensure your Excel file contains valid Shein or TikTok order columns.")
@@ -313,6 +516,44 @@ with col2:
         # Cleanup Excel
         if os.path.exists(tmp_input_path):
             os.unlink(tmp_input_path)
+
+    # Reprint from the archive of past runs, without re-uploading anything
+    with st.expander("🔁 Reprint Labels"):
+        reprint_ids = st.text_area(
+            "Tracking IDs or Order IDs",
+            help="One per line (or separated by commas)",
+            key='reprint_ids'
+        )
+        reprint_kind = st.radio(
+            "Label type",
+            options=['sorted', 'generated'],
+            format_func=lambda kind: "Carrier labels (sorted)" if kind == 'sorted' else "Generated labels",
+            horizontal=True,
+            key='reprint_kind'
+        )
+
+        if st.button("Find Labels", key='reprint_find'):
+            label_ids = [i.strip() for i in reprint_ids.replace(',', '\n').splitlines() if i.strip()]
+            if not label_ids:
+                st.warning("Enter at least one tracking ID or order ID.")
+            else:
+                reprint_buffer = io.BytesIO()
+                try:
+                    reprint_stats = get_label_archive().extract_pages(label_ids, reprint_buffer, kind=reprint_kind)
+                except Exception as e:
+                    st.error(f"Could not read the label archive: {e}")
+                    reprint_stats = {'pages': 0, 'missing_ids': []}
+
+                if reprint_stats['missing_ids']:
+                    st.warning(f"Not found in archive: {', '.join(reprint_stats['missing_ids'])}")
+                if reprint_stats['pages'] > 0:
+                    st.success(f"Found {reprint_stats['pages']} label pages.")
+                    st.download_button(
+                        label="Download Reprint",
+                        data=reprint_buffer.getvalue(),
+                        file_name="etiquetas_reimpresion.pdf",
+                        mime="application/pdf"
+                    )
     
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -322,3 +563,7 @@ with col2:
             POWERED BY ANTIGRAVITY
         </div>
     """, unsafe_allow_html=True)
+
+# Warm up the PDF stack after the first paint, while the user picks a file
+if not os.environ.get('LABEL_APP_SKIP_PRELOAD'):
+    start_pdf_engine_preload()
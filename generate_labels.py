@@ -1,14 +1,32 @@
 import pandas as pd
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+import io
 import os
+from order_validation import validate_orders
+
+# ReportLab is imported inside the rendering functions so that format
+# detection (and the app's first page paint) doesn't pay for it.
+
+LABEL_FONTS = ("Helvetica", "Helvetica-Bold")
+
+class UnrecognizedFormatError(ValueError):
+    """Raised by load_and_normalize_data when the file is neither TikTok nor Shein."""
+
+def warm_up_fonts():
+    """Import ReportLab and load the metrics of the fonts used on the labels."""
+    from reportlab.pdfbase import pdfmetrics
+    for font_name in LABEL_FONTS:
+        pdfmetrics.stringWidth("0", font_name, 10)
+
+def _tracking_ids_by_row(rows):
+    """Excel row index -> tracking ID for rows that have one."""
+    return {int(row): tid for row, tid in rows['tracking_id'].items() if tid != 'N/A'}
 
 def load_and_normalize_data(file_path):
     """
     Load data from Excel and normalize + return stats
+
+    stats['dropped_tracking_ids'] maps the Excel row index of each dropped
+    row to its tracking ID, so label sorting can still place those labels.
     
     Returns:
         (DataFrame, dict): Normalized data and processing stats
@@ -18,6 +36,7 @@ def load_and_normalize_data(file_path):
         'valid_rows': 0,
         'dropped_rows': 0,
         'drop_reasons': [],
+        'dropped_tracking_ids': {},
         'format_detected': 'Unknown'
     }
 
@@ -50,6 +69,7 @@ def load_and_normalize_data(file_path):
                 drop_count = missing_qty.sum()
                 stats['dropped_rows'] += int(drop_count)
                 stats['drop_reasons'].append(f"{drop_count} rows dropped due to invalid/missing Quantity")
+                stats['dropped_tracking_ids'] = _tracking_ids_by_row(normalized[missing_qty])
             
             # Drop rows with invalid quantity
             normalized = normalized.dropna(subset=['quantity'])
@@ -80,6 +100,7 @@ def load_and_normalize_data(file_path):
                  drop_count = missing_sku.sum()
                  stats['dropped_rows'] += int(drop_count)
                  stats['drop_reasons'].append(f"{drop_count} rows with missing SKU")
+                 stats['dropped_tracking_ids'] = _tracking_ids_by_row(normalized[missing_sku])
                  normalized = normalized.dropna(subset=['sku'])
 
             normalized['quantity'] = 1 
@@ -90,12 +111,45 @@ def load_and_normalize_data(file_path):
     except Exception as e:
         print(f"Error reading as Shein: {e}")
 
-    raise ValueError("File format not recognized (neither TikTok with 'Order ID' nor Shein with 'Número de pedido' found)")
+    raise UnrecognizedFormatError("File format not recognized (neither TikTok with 'Order ID' nor Shein with 'Número de pedido' found)")
+
+def generate_labels_and_summary(input_file, output_file, data=None, include_labels=True, fail_fast=False,
+                                segment_callback=None, segment_size=25):
+    """
+    Render order labels followed by the SKU picking list.
+
+    Args:
+        input_file: Path to the orders Excel file.
+        output_file: Path or binary file-like object for the output PDF.
+        data: Optional (DataFrame, stats) tuple already returned by
+            load_and_normalize_data, to skip re-reading the Excel file.
+        include_labels: When False only the picking list pages are rendered.
+        fail_fast: Raise OrderValidationError before rendering if the
+            pre-flight validation finds errors.
+        segment_callback: If given, output_file is not written. Instead,
+            every `segment_size` orders the pages rendered so far are saved
+            as a standalone PDF and its bytes are passed to this callable,
+            so printing can start while rendering continues. The last
+            segment holds the remaining labels and the picking list.
+
+    Returns:
+        dict: Processing stats. 'page_ids' lists (tracking_id, order_id) for
+        each label page, in page order; the picking list pages follow them.
+    """
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.units import mm
+    from reportlab.lib.pagesizes import A4
 
-def generate_labels_and_summary(input_file, output_file):
     # Load and normalize data
     # Let exceptions propagate to the UI
-    df, stats = load_and_normalize_data(input_file)
+    if data is None:
+        df, stats = load_and_normalize_data(input_file)
+    else:
+        # Copy stats so cached results are not mutated below
+        df, stats = data[0], dict(data[1])
+
+    # Pre-flight validation, before anything is rendered
+    stats['validation'] = validate_orders(df, fail_fast=fail_fast)
 
     # Aggregate data by order_id, package_id, tracking_id, sku, source
     # This sums up quantities for the same SKU in the same order
@@ -107,8 +161,26 @@ def generate_labels_and_summary(input_file, output_file):
     # To be safe and close to original behavior:
     unique_orders = df['order_id'].drop_duplicates().tolist()
 
+    # (tracking_id, order_id) of every label page, used by the reprint archive
+    stats['page_ids'] = []
+
     # Create Canvas
-    c = canvas.Canvas(output_file)
+    if segment_callback is None:
+        c = canvas.Canvas(output_file)
+    else:
+        segment_buffer = io.BytesIO()
+        c = canvas.Canvas(segment_buffer)
+        orders_in_segment = 0
+        stats['segments'] = 0
+
+    def flush_segment(c):
+        """Hand the current segment to segment_callback and return a fresh canvas."""
+        nonlocal segment_buffer
+        c.save()
+        segment_callback(segment_buffer.getvalue())
+        stats['segments'] += 1
+        segment_buffer = io.BytesIO()
+        return canvas.Canvas(segment_buffer)
     
     # Label Dimensions
     label_width = 63 * mm
@@ -117,13 +189,17 @@ def generate_labels_and_summary(input_file, output_file):
 
     # Data for summary
     sku_summary = {}
+    for _, row in df_agg.iterrows():
+        sku = str(row['sku'])
+        sku_summary[sku] = sku_summary.get(sku, 0) + int(row['quantity'])
     
     # Page counter
     page_number = 1
 
-    print(f"Generating labels for {len(unique_orders)} orders...")
+    if include_labels:
+        print(f"Generating labels for {len(unique_orders)} orders...")
 
-    for order_id in unique_orders:
+    for order_id in (unique_orders if include_labels else []):
         # Get all rows for this order from aggregated df
         group = df_agg[df_agg['order_id'] == order_id]
         
@@ -191,12 +267,6 @@ def generate_labels_and_summary(input_file, output_file):
             sku = str(row['sku'])
             qty = int(row['quantity'])
             
-            # Add to summary
-            if sku in sku_summary:
-                sku_summary[sku] += qty
-            else:
-                sku_summary[sku] = qty
-            
             # Draw Item Line
             # Truncate SKU if too long
             display_sku = (sku[:25] + '..') if len(sku) > 25 else sku
@@ -214,6 +284,7 @@ def generate_labels_and_summary(input_file, output_file):
                 c.drawString((label_width - text_width) / 2, margin / 2, page_text)
                 
                 c.showPage()
+                stats['page_ids'].append((numero_guia, str(order_id)))
                 page_number += 1
                 
                 # Start new page for same order
@@ -228,8 +299,15 @@ def generate_labels_and_summary(input_file, output_file):
         c.drawString((label_width - text_width) / 2, margin / 2, page_text)
         
         c.showPage()
+        stats['page_ids'].append((numero_guia, str(order_id)))
         page_number += 1
 
+        if segment_callback is not None:
+            orders_in_segment += 1
+            if orders_in_segment >= segment_size:
+                c = flush_segment(c)
+                orders_in_segment = 0
+
     # Summary Section
     print("Generating summary page...")
     c.setPageSize(A4)
@@ -274,8 +352,12 @@ def generate_labels_and_summary(input_file, output_file):
             y_pos = height - 20 * mm
             c.setFont("Helvetica", 10)
 
-    c.save()
-    print(f"PDF generated: {output_file}")
+    if segment_callback is None:
+        c.save()
+        print(f"PDF generated: {output_file}")
+    else:
+        flush_segment(c)
+        print(f"PDF generated in {stats['segments']} segments")
     
     stats['unique_orders'] = len(unique_orders)
     return stats
@@ -0,0 +1,277 @@
+"""
+Append-only archive of label PDFs for instant reprints.
+
+Every sorted or generated PDF is stored once (by content hash) together with
+an SQLite index of tracking ID / order ID -> (file, page). A reprint looks
+the pages up in the index and copies them into a new PDF, without reading
+the orders Excel or extracting any page text.
+
+Files are stored split into chunks of PAGES_PER_CHUNK pages: PyPDF2 walks
+the whole page tree on first page access, so a reprint from one small chunk
+takes milliseconds while the same page of a 3000-page file takes ~0.5 s.
+
+Usage:
+    python label_archive.py lookup 805590945541C700122491
+    python label_archive.py reprint 805590945541C700122491 581709258912662564 -o reprint.pdf
+    python label_archive.py reprint GSH1QK07300541V --kind generated -o reprint.pdf
+    python label_archive.py info
+"""
+import argparse
+import contextlib
+import hashlib
+import os
+import shutil
+import sqlite3
+import time
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'label_archive')
+
+# Sorted carrier labels vs. labels rendered by generate_labels_and_summary
+KINDS = ('sorted', 'generated')
+
+PAGES_PER_CHUNK = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT UNIQUE NOT NULL,
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    format TEXT,
+    source_name TEXT,
+    indexed_pages INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    page INTEGER NOT NULL,
+    tracking_id TEXT,
+    order_id TEXT
+);
+CREATE INDEX IF NOT EXISTS pages_tracking ON pages(tracking_id);
+CREATE INDEX IF NOT EXISTS pages_order ON pages(order_id);
+"""
+
+
+class LabelArchive:
+    """Local archive rooted at a directory holding index.sqlite3 and files/."""
+
+    def __init__(self, root=DEFAULT_ARCHIVE_DIR):
+        self.root = root
+        self.files_dir = os.path.join(root, 'files')
+        os.makedirs(self.files_dir, exist_ok=True)
+        self.db_path = os.path.join(root, 'index.sqlite3')
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps the archive safe to use from
+        # several Streamlit sessions / threads at once
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add_pdf(self, pdf, page_ids, kind, format_detected=None, source_name=None):
+        """
+        Archive a PDF and index its pages. Pages beyond page_ids (e.g. the
+        picking list of a generated PDF) are not archived.
+
+        Args:
+            pdf: Path or bytes of a PDF produced by sort_labels or
+                generate_labels_and_summary.
+            page_ids: (tracking_id, order_id) per page, i.e. stats['page_ids'].
+            kind: 'sorted' or 'generated'.
+
+        Returns:
+            int: File id in the archive. Archiving the same PDF again is a
+            no-op that returns the existing id.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}")
+
+        if isinstance(pdf, (bytes, bytearray)):
+            pdf_bytes = bytes(pdf)
+        else:
+            with open(pdf, 'rb') as f:
+                pdf_bytes = f.read()
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT id FROM files WHERE sha256 = ?", (digest,)).fetchone()
+            if row is not None:
+                return row[0]
+
+            stored_path = os.path.join(self.files_dir, digest)
+            if not os.path.exists(stored_path):
+                _write_chunks(pdf_bytes, len(page_ids), stored_path)
+
+            cursor = conn.execute(
+                "INSERT INTO files (sha256, path, kind, format, source_name, indexed_pages, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (digest, os.path.relpath(stored_path, self.root), kind, format_detected, source_name,
+                 len(page_ids), time.strftime('%Y-%m-%d %H:%M:%S')),
+            )
+            file_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO pages (file_id, page, tracking_id, order_id) VALUES (?, ?, ?, ?)",
+                [(file_id, page, _normalize_id(tracking_id), _normalize_id(order_id))
+                 for page, (tracking_id, order_id) in enumerate(page_ids)],
+            )
+        return file_id
+
+    def lookup(self, label_id, kind=None):
+        """
+        Find the archived pages for a tracking ID or order ID.
+
+        Returns:
+            list of dict: Newest file first, each with 'file_id', 'path' (the
+            chunk directory), 'kind', 'created_at' and the matching 'pages'.
+        """
+        nid = _normalize_id(label_id)
+        query = ("SELECT f.id, f.path, f.kind, f.created_at, p.page FROM pages p "
+                 "JOIN files f ON f.id = p.file_id "
+                 "WHERE (p.tracking_id = ? OR p.order_id = ?)")
+        params = [nid, nid]
+        if kind is not None:
+            query += " AND f.kind = ?"
+            params.append(kind)
+        query += " ORDER BY f.id DESC, p.page"
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        matches = {}
+        for file_id, path, file_kind, created_at, page in rows:
+            match = matches.setdefault(file_id, {
+                'file_id': file_id,
+                'path': os.path.join(self.root, path),
+                'kind': file_kind,
+                'created_at': created_at,
+                'pages': [],
+            })
+            match['pages'].append(page)
+        return list(matches.values())
+
+    def extract_pages(self, label_ids, output, kind=None):
+        """
+        Write the most recently archived pages for each ID into a new PDF.
+
+        Args:
+            label_ids: Tracking IDs and/or order IDs, in the desired order.
+            output: Path or binary file-like object for the reprint PDF.
+            kind: Only use 'sorted' or 'generated' files.
+
+        Returns:
+            dict: 'pages' written and 'missing_ids' not found in the archive.
+        """
+        import PyPDF2
+
+        stats = {'pages': 0, 'missing_ids': []}
+        writer = PyPDF2.PdfWriter()
+        readers = {}
+
+        for label_id in label_ids:
+            matches = self.lookup(label_id, kind=kind)
+            if not matches:
+                stats['missing_ids'].append(label_id)
+                continue
+            newest = matches[0]
+            for page in newest['pages']:
+                chunk_path = _chunk_path(newest['path'], page // PAGES_PER_CHUNK)
+                if chunk_path not in readers:
+                    readers[chunk_path] = PyPDF2.PdfReader(chunk_path)
+                writer.add_page(readers[chunk_path].pages[page % PAGES_PER_CHUNK])
+                stats['pages'] += 1
+
+        if hasattr(output, 'write'):
+            writer.write(output)
+        else:
+            with open(output, 'wb') as f:
+                writer.write(f)
+        return stats
+
+    def info(self):
+        with self._connect() as conn:
+            files = conn.execute("SELECT COUNT(*), COALESCE(SUM(indexed_pages), 0) FROM files").fetchone()
+        return {'files': files[0], 'pages': files[1], 'root': self.root}
+
+
+def _chunk_path(stored_path, chunk):
+    return os.path.join(stored_path, f"{chunk:05d}.pdf")
+
+
+def _write_chunks(pdf_bytes, page_count, stored_path):
+    """Split the first page_count pages of the PDF into chunk files under stored_path."""
+    import io
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    tmp_dir = stored_path + '.part'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    for chunk, start in enumerate(range(0, page_count, PAGES_PER_CHUNK)):
+        writer = PyPDF2.PdfWriter()
+        for page in reader.pages[start:start + PAGES_PER_CHUNK]:
+            writer.add_page(page)
+        with open(_chunk_path(tmp_dir, chunk), 'wb') as f:
+            writer.write(f)
+
+    # Rename at the end so a crash never leaves a half-written entry behind
+    os.replace(tmp_dir, stored_path)
+
+
+def _normalize_id(value):
+    """
+    IDs are indexed the way label_sorter.normalize_text matches them (no
+    spaces or hyphens). Kept local so lookups don't need to import pandas.
+    """
+    if value is None or value != value:  # None or NaN
+        return None
+    normalized = str(value).replace("-", "").replace(" ", "").strip()
+    if not normalized or normalized.upper() == 'N/A':
+        return None
+    return normalized
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive of label PDFs for reprints")
+    parser.add_argument('--archive', default=DEFAULT_ARCHIVE_DIR, help="Archive directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    lookup_cmd = commands.add_parser('lookup', help="Show where the labels for an ID are archived")
+    lookup_cmd.add_argument('label_id', help="Tracking ID or order ID")
+    lookup_cmd.add_argument('--kind', choices=KINDS)
+
+    reprint_cmd = commands.add_parser('reprint', help="Extract archived labels into a new PDF")
+    reprint_cmd.add_argument('label_ids', nargs='+', help="Tracking IDs and/or order IDs")
+    reprint_cmd.add_argument('-o', '--output', default='reprint.pdf')
+    reprint_cmd.add_argument('--kind', choices=KINDS)
+
+    commands.add_parser('info', help="Show archive size")
+
+    args = parser.parse_args()
+    archive = LabelArchive(args.archive)
+
+    if args.command == 'lookup':
+        matches = archive.lookup(args.label_id, kind=args.kind)
+        if not matches:
+            print(f"{args.label_id}: not found")
+        for match in matches:
+            pages = ', '.join(str(p + 1) for p in match['pages'])
+            print(f"{match['created_at']}  {match['kind']:<9}  {match['path']}  pages {pages}")
+    elif args.command == 'reprint':
+        start = time.perf_counter()
+        stats = archive.extract_pages(args.label_ids, args.output, kind=args.kind)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"Wrote {stats['pages']} pages to {args.output} in {elapsed_ms:.0f} ms")
+        if stats['missing_ids']:
+            print(f"Not found: {', '.join(stats['missing_ids'])}")
+    else:
+        info = archive.info()
+        print(f"{info['files']} files, {info['pages']} pages in {info['root']}")
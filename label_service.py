@@ -0,0 +1,250 @@
+"""
+Local HTTP service for label generation.
+
+Exposes the same processing as the Streamlit app over a small JSON API so
+other systems (e.g. the WMS) can request labels programmatically.
+
+Endpoints (all POST bodies are JSON, files are base64 encoded):
+    GET  /health                      -> service and cache status
+    POST /detect        {excel}       -> detected format, stats and validation report
+    POST /labels        {excel}       -> labels + picking list PDF
+    POST /picking-list  {excel}       -> picking list PDF only
+    POST /sort          {excel, pdf}  -> carrier labels PDF sorted by Excel order
+                                         (TikTok or Shein; /tiktok/sort is an alias)
+
+Set "fail_fast": true on /labels or /picking-list to get a 422 with the
+validation report instead of a PDF when the file has errors.
+
+PDF responses are returned as {"stats": {...}, "pdf": "<base64>"}.
+
+Usage:
+    python label_service.py --port 8765 --workers 2 --queue 16
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import PyPDF2
+
+from generate_labels import UnrecognizedFormatError, generate_labels_and_summary, load_and_normalize_data
+from label_sorter import extract_page_texts, sort_labels
+from order_validation import OrderValidationError, validate_orders
+from result_cache import LRUCache
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class LabelService:
+    """
+    Runs label jobs on a bounded worker pool and shares caches across requests.
+
+    At most `workers` jobs run at once and up to `max_queue` more wait for a
+    free worker; anything beyond that is rejected with QueueFullError.
+    """
+
+    def __init__(self, workers=2, max_queue=16, cache_size=32):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='label-worker')
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self.workers = workers
+        self.max_queue = max_queue
+        # Parsed Excel data: digest -> (normalized DataFrame, stats)
+        self.parse_cache = LRUCache(max_items=cache_size)
+        # Normalized PDF page texts: digest -> list of str
+        self.extraction_cache = LRUCache(max_items=cache_size)
+
+    def submit(self, fn, *args):
+        """Run fn on the pool and wait for its result."""
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError(f"Queue full ({self.workers} running, {self.max_queue} waiting)")
+        try:
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+    # Cached steps
+
+    def _normalized(self, excel_bytes, excel_path):
+        key = ('normalized', hashlib.sha256(excel_bytes).hexdigest())
+        return self.parse_cache.get_or_compute(key, lambda: load_and_normalize_data(excel_path))
+
+    def _page_texts(self, pdf_bytes, pdf_path):
+        key = hashlib.sha256(pdf_bytes).hexdigest()
+        return self.extraction_cache.get_or_compute(
+            key, lambda: extract_page_texts(PyPDF2.PdfReader(pdf_path))
+        )
+
+    # Jobs
+
+    def detect(self, excel_bytes):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            excel_path = _write_temp(tmp_dir, 'input.xlsx', excel_bytes)
+            df, stats = self._normalized(excel_bytes, excel_path)
+        return {'stats': stats, 'validation': validate_orders(df)}
+
+    def labels(self, excel_bytes, include_labels=True, fail_fast=False):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            excel_path = _write_temp(tmp_dir, 'input.xlsx', excel_bytes)
+            output_path = os.path.join(tmp_dir, 'output.pdf')
+            data = self._normalized(excel_bytes, excel_path)
+            stats = generate_labels_and_summary(excel_path, output_path, data=data,
+                                                include_labels=include_labels,
+                                                fail_fast=fail_fast)
+            with open(output_path, 'rb') as f:
+                pdf_data = f.read()
+        return {'stats': stats, 'pdf': pdf_data}
+
+    def picking_list(self, excel_bytes, fail_fast=False):
+        return self.labels(excel_bytes, include_labels=False, fail_fast=fail_fast)
+
+    def sort(self, excel_bytes, pdf_bytes):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            excel_path = _write_temp(tmp_dir, 'input.xlsx', excel_bytes)
+            pdf_path = _write_temp(tmp_dir, 'labels.pdf', pdf_bytes)
+            output_path = os.path.join(tmp_dir, 'output.pdf')
+            # Bad uploads are reported like sort_labels reports them, not as server errors
+            try:
+                data = self._normalized(excel_bytes, excel_path)
+            except Exception as e:
+                return {'stats': {'success': False, 'error': f"Error reading Excel: {e}"}, 'pdf': None}
+            try:
+                page_texts = self._page_texts(pdf_bytes, pdf_path)
+            except Exception as e:
+                return {'stats': {'success': False, 'error': f"Error reading PDF: {e}"}, 'pdf': None}
+            stats = sort_labels(excel_path, pdf_path, output_path,
+                                data=data, page_texts=page_texts)
+            pdf_data = None
+            if stats['success']:
+                with open(output_path, 'rb') as f:
+                    pdf_data = f.read()
+        return {'stats': stats, 'pdf': pdf_data}
+
+
+def _write_temp(tmp_dir, name, data):
+    path = os.path.join(tmp_dir, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def _decode_field(payload, name):
+    if name not in payload:
+        raise ValueError(f"Missing field '{name}'")
+    return base64.b64decode(payload[name])
+
+
+def _to_json(value):
+    """json.dumps default for numpy/pandas scalars in stats dicts."""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class LabelRequestHandler(BaseHTTPRequestHandler):
+    service = None  # Set by make_server
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {
+                'status': 'ok',
+                'workers': self.service.workers,
+                'max_queue': self.service.max_queue,
+                'parse_cache': self.service.parse_cache.info(),
+                'extraction_cache': self.service.extraction_cache.info(),
+            })
+        else:
+            self._send_json(404, {'error': f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        routes = {
+            '/detect': lambda p: (self.service.detect, _decode_field(p, 'excel')),
+            '/labels': lambda p: (self.service.labels, _decode_field(p, 'excel'), True,
+                                  bool(p.get('fail_fast', False))),
+            '/picking-list': lambda p: (self.service.picking_list, _decode_field(p, 'excel'),
+                                        bool(p.get('fail_fast', False))),
+            '/sort': lambda p: (self.service.sort, _decode_field(p, 'excel'),
+                                _decode_field(p, 'pdf')),
+        }
+        routes['/tiktok/sort'] = routes['/sort']
+        if self.path not in routes:
+            self._send_json(404, {'error': f"Unknown endpoint {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            job = routes[self.path](payload)
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {'error': f"Invalid request: {e}"})
+            return
+
+        try:
+            result = self.service.submit(*job)
+        except QueueFullError as e:
+            self._send_json(503, {'error': str(e)})
+            return
+        except OrderValidationError as e:
+            self._send_json(422, {'error': str(e), 'validation': e.report})
+            return
+        except UnrecognizedFormatError as e:
+            self._send_json(422, {'error': str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+            return
+
+        if result.get('pdf') is not None:
+            result['pdf'] = base64.b64encode(result['pdf']).decode('ascii')
+        status = 200 if result['stats'].get('error') is None else 422
+        self._send_json(status, result)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body, default=_to_json).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        print(f"[label_service] {self.address_string()} {format % args}")
+
+
+def make_server(host='127.0.0.1', port=8765, workers=2, max_queue=16, cache_size=32):
+    """Create (but do not start) the HTTP server and its LabelService."""
+    service = LabelService(workers=workers, max_queue=max_queue, cache_size=cache_size)
+    handler = type('BoundLabelRequestHandler', (LabelRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP service for label generation")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=2, help="Concurrent label jobs")
+    parser.add_argument('--queue', type=int, default=16, help="Jobs allowed to wait for a worker")
+    parser.add_argument('--cache-size', type=int, default=32, help="Entries per cache")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.workers, args.queue, args.cache_size)
+    print(f"Label service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.shutdown()
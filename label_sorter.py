@@ -2,6 +2,8 @@ import pandas as pd
 import PyPDF2
 import re
 import os
+from generate_labels import load_and_normalize_data
+from order_validation import MIN_TRACKING_ID_LENGTH
 
 def normalize_text(text):
     """Normalize text data: remove hyphens and spaces."""
@@ -9,40 +11,150 @@ def normalize_text(text):
         return ""
     return str(text).replace("-", "").replace(" ", "").strip()
 
-def sort_tiktok_labels(excel_path, pdf_path, output_pdf_path):
+def extract_page_texts(reader):
+    """Extract and normalize the text of every page in a PdfReader."""
+    return [normalize_text(page.extract_text()) for page in reader.pages]
+
+# Below this many page x ID checks the plain substring scan is fastest
+SCAN_MAX_CHECKS = 250_000
+
+def _id_trie_pattern(ids):
+    """
+    Compile the IDs into one regex shaped like a trie, so each position of a
+    page is tested against all IDs at once instead of one ID at a time.
+    The lookahead reports the longest ID starting at every position, even
+    where matches overlap.
+    """
+    trie = {}
+    for nid in ids:
+        node = trie
+        for ch in nid:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in node.items() if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return re.compile(f'(?=({build(trie)}))')
+
+def index_label_pages(page_texts, target_ids):
+    """
+    Map each normalized tracking ID to the indexes of the pages that contain it.
+    A page containing several IDs is assigned to the one that comes first in
+    target_ids.
+
+    Small batches use a substring scan of every ID on every page. Above
+    SCAN_MAX_CHECKS page x ID checks, all IDs are matched in one regex pass
+    per page, so the cost follows the amount of page text instead.
+
+    Returns:
+        (dict, int): ID -> list of page indexes, and the number of unmatched pages
     """
-    Sorts PDF labels based on 'Tracking ID' from Excel file.
+    rank = {}
+    for nid in target_ids:
+        rank.setdefault(nid, len(rank))
+    unique_ids = list(rank)
+
+    id_to_pages = {nid: [] for nid in unique_ids}
+    unmatched_pages = 0
+
+    if len(page_texts) * len(unique_ids) <= SCAN_MAX_CHECKS:
+        for page_index, text in enumerate(page_texts):
+            for nid in unique_ids:
+                if nid in text:
+                    id_to_pages[nid].append(page_index)
+                    break
+            else:
+                unmatched_pages += 1
+        return id_to_pages, unmatched_pages
+
+    pattern = _id_trie_pattern(unique_ids)
+    # The regex reports only the longest ID at a position; shorter IDs that
+    # are a prefix of it are found there too
+    lengths = sorted({len(nid) for nid in unique_ids})
+    prefix_ranks = {nid: [rank[nid[:n]] for n in lengths if n < len(nid) and nid[:n] in rank]
+                    for nid in unique_ids}
+
+    for page_index, text in enumerate(page_texts):
+        best = None
+        for match in pattern.finditer(text):
+            nid = match.group(1)
+            if nid:
+                found = min([rank[nid], *prefix_ranks[nid]])
+                if best is None or found < best:
+                    best = found
+
+        if best is None:
+            unmatched_pages += 1
+        else:
+            id_to_pages[unique_ids[best]].append(page_index)
+
+    return id_to_pages, unmatched_pages
+
+def sort_labels(excel_path, pdf_path, output_pdf_path, data=None, page_texts=None):
+    """
+    Sorts carrier label PDF pages into the order of the tracking IDs in the
+    orders Excel file. Works for any format load_and_normalize_data detects
+    (TikTok 'Tracking ID', Shein 'Número de guía').
+
+    data (the (DataFrame, stats) tuple from load_and_normalize_data) and
+    page_texts may be passed in (e.g. from a cache) to skip reading the Excel
+    file and re-extracting the PDF page text.
+
+    stats['page_ids'] lists (tracking_id, order_id) for each output page.
+    stats['dropped_row_ids'] lists the tracking IDs of rows that
+    load_and_normalize_data dropped; their labels are still sorted.
     """
     stats = {
+        'format_detected': 'Unknown',
         'total_excel_ids': 0,
         'matched_pages': 0,
         'missing_ids': [],
+        'short_ids': [],
+        'dropped_row_ids': [],
         'unmatched_pages': 0,
+        'page_ids': [],
         'success': False,
         'error': None
     }
 
-    print("Reading Excel file for sorting...")
-    try:
-        df = pd.read_excel(excel_path)
-    except Exception as e:
-        stats['error'] = f"Error reading Excel: {e}"
-        return stats
+    if data is None:
+        print("Reading Excel file for sorting...")
+        try:
+            data = load_and_normalize_data(excel_path)
+        except Exception as e:
+            stats['error'] = f"Error reading Excel: {e}"
+            return stats
 
-    # Check for 'Tracking ID' column
-    if 'Tracking ID' not in df.columns:
-        stats['error'] = "Error: 'Tracking ID' column not found in Excel. Cannot sort labels."
-        return stats
+    df, load_stats = data
+    stats['format_detected'] = load_stats.get('format_detected', 'Unknown')
 
     # Extract relevant IDs, keeping order and removing duplicates
     # Use a dictionary to keep order and remove duplicates
-    target_ids = list(dict.fromkeys(df['Tracking ID'].dropna()))
-    
+    # Rows dropped by normalization (e.g. invalid quantity) still have a label
+    # in the PDF, so their tracking IDs are put back in their Excel position
+    dropped = load_stats.get('dropped_tracking_ids') or {}
+    tracking = pd.concat([df['tracking_id'], pd.Series(dropped, dtype=object)]).sort_index(kind='stable').dropna()
+    target_ids = list(dict.fromkeys(tracking[tracking.astype(str) != 'N/A']))
+
     # Normalize target IDs for matching
-    normalized_target_ids = [normalize_text(tid) for tid in target_ids]
-    
-    stats['total_excel_ids'] = len(target_ids)
-    print(f"Found {len(target_ids)} unique Tracking IDs in Excel.")
+    normalized_target_ids = list(dict.fromkeys(normalize_text(tid) for tid in target_ids))
+    stats['dropped_row_ids'] = list(dict.fromkeys(normalize_text(tid) for tid in dropped.values()))
+
+    stats['total_excel_ids'] = len(normalized_target_ids)
+    print(f"Found {len(normalized_target_ids)} unique tracking IDs in Excel ({stats['format_detected']}).")
+
+    if not normalized_target_ids:
+        stats['error'] = "Error: no tracking IDs found in Excel. Cannot sort labels."
+        return stats
+
+    # Short IDs would match inside unrelated label text, so they are not searched
+    matchable_ids = [nid for nid in normalized_target_ids if len(nid) >= MIN_TRACKING_ID_LENGTH]
+    stats['short_ids'] = [nid for nid in normalized_target_ids if len(nid) < MIN_TRACKING_ID_LENGTH]
 
     print("Reading PDF file...")
     try:
@@ -53,34 +165,14 @@ def sort_tiktok_labels(excel_path, pdf_path, output_pdf_path):
         stats['error'] = f"Error reading PDF: {e}"
         return stats
 
-    # Map Normalized ID -> Page Object
-    id_to_pages = {nid: [] for nid in normalized_target_ids}
-    
     print("Indexing PDF pages...")
-    unmatched_pages_count = 0
-    
-    for i, page in enumerate(reader.pages):
-        text = page.extract_text()
-        normalized_page_text = normalize_text(text)
-        
-        found = False
-        for nid in normalized_target_ids:
-            # Check if ID is in page text
-            # Note: normalized_ids usually don't have spaces, page text might or might not.
-            # Normalizing page text handles spaces/hyphens removal.
-            if len(nid) > 5 and nid in normalized_page_text: # Ensure ID is not too short to avoid false positives?
-                id_to_pages[nid].append(page)
-                found = True
-                break 
-            elif nid in normalized_page_text: # Fallback for shorter IDs logic if necessary, or just standard check
-                 id_to_pages[nid].append(page)
-                 found = True
-                 break
-        
-        if not found:
-            unmatched_pages_count += 1
-
-    stats['unmatched_pages'] = unmatched_pages_count
+    if page_texts is None:
+        page_texts = extract_page_texts(reader)
+
+    id_to_pages, stats['unmatched_pages'] = index_label_pages(page_texts, matchable_ids)
+
+    # Normalized tracking ID -> order ID, to record which order each output page belongs to
+    order_by_tracking = dict(zip(df['tracking_id'].map(normalize_text), df['order_id'].astype(str)))
 
     # Create Writer
     writer = PyPDF2.PdfWriter()
@@ -92,18 +184,17 @@ def sort_tiktok_labels(excel_path, pdf_path, output_pdf_path):
     for nid in normalized_target_ids:
         pages = id_to_pages.get(nid, [])
         if pages:
-            for page in pages:
-                writer.add_page(page)
-                # Count distinct labels/IDs matched, not just total pages
-                # If multiple IDs are on one page, we might add the page multiple times, which is standard behavior for 'per order' printing
+            for page_index in pages:
+                writer.add_page(reader.pages[page_index])
+                stats['page_ids'].append((nid, order_by_tracking.get(nid)))
+                added_count += 1
         else:
             missing_ids.append(nid)
 
-    # Calculate matched labels count (unique IDs found)
-    stats['matched_pages'] = added_count # This is actually pages added
+    stats['matched_pages'] = added_count
+    stats['missing_ids'] = missing_ids
     stats['matched_ids_count'] = len(normalized_target_ids) - len(missing_ids)
 
-
     # Save Output
     print(f"Writing output to {output_pdf_path}...")
     try:
@@ -114,3 +205,10 @@ def sort_tiktok_labels(excel_path, pdf_path, output_pdf_path):
         stats['error'] = f"Error writing output PDF: {e}"
 
     return stats
+
+def sort_tiktok_labels(excel_path, pdf_path, output_pdf_path, data=None, page_texts=None):
+    """
+    Sorts TikTok PDF labels based on 'Tracking ID' from Excel file.
+    Kept for existing callers; see sort_labels.
+    """
+    return sort_labels(excel_path, pdf_path, output_pdf_path, data=data, page_texts=page_texts)
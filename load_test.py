@@ -0,0 +1,130 @@
+"""
+Load test for label_service.py.
+
+Fires N requests at an endpoint with a given concurrency and reports
+throughput and latency percentiles of the successful (2xx) responses.
+Rejections (503 queue full), other errors and connection failures are
+counted separately, since they return quickly and would flatter both
+numbers. Without --url a local service is started in-process on a free port.
+
+Usage:
+    python load_test.py --excel "Pedidos tiktok.xlsx" --endpoint labels -n 50 -c 4
+    python load_test.py --excel "Pedidos tiktok.xlsx" --pdf labels.pdf --endpoint sort
+"""
+import argparse
+import base64
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+def run_load_test(url, endpoint, payload, total_requests, concurrency):
+    body = json.dumps(payload).encode('utf-8')
+    target = f"{url.rstrip('/')}/{endpoint.strip('/')}"
+    latencies = []
+    status_counts = {}
+    lock = threading.Lock()
+
+    def one_request(_):
+        request = urllib.request.Request(target, data=body, headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except urllib.error.URLError:
+            status = 'connection error'
+        elapsed = time.perf_counter() - start
+        with lock:
+            if isinstance(status, int) and 200 <= status < 300:
+                latencies.append(elapsed)
+            status_counts[status] = status_counts.get(status, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(total_requests)))
+    wall = time.perf_counter() - start
+
+    succeeded = len(latencies)
+    return {
+        'requests': total_requests,
+        'concurrency': concurrency,
+        'wall_seconds': wall,
+        'succeeded': succeeded,
+        'rejected': status_counts.get(503, 0),
+        'failed': total_requests - succeeded - status_counts.get(503, 0),
+        'throughput_rps': succeeded / wall if wall else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'max_ms': max(latencies) * 1000 if latencies else 0.0,
+        'status_counts': status_counts,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for the label HTTP service")
+    parser.add_argument('--url', help="Service base URL (default: start a local service)")
+    parser.add_argument('--endpoint', default='labels',
+                        choices=['detect', 'labels', 'picking-list', 'sort', 'tiktok/sort'])
+    parser.add_argument('--excel', required=True, help="Orders Excel file")
+    parser.add_argument('--pdf', help="Labels PDF (required for sort)")
+    parser.add_argument('-n', '--requests', type=int, default=50)
+    parser.add_argument('-c', '--concurrency', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=2, help="Workers for the local service")
+    parser.add_argument('--queue', type=int, default=16, help="Queue size for the local service")
+    args = parser.parse_args()
+
+    payload = {}
+    with open(args.excel, 'rb') as f:
+        payload['excel'] = base64.b64encode(f.read()).decode('ascii')
+    if args.endpoint in ('sort', 'tiktok/sort'):
+        if not args.pdf:
+            parser.error("--pdf is required for sort")
+        with open(args.pdf, 'rb') as f:
+            payload['pdf'] = base64.b64encode(f.read()).decode('ascii')
+
+    server = None
+    url = args.url
+    if url is None:
+        from label_service import make_server
+        server = make_server(port=0, workers=args.workers, max_queue=args.queue)
+        # Keep request logging out of the report
+        server.RequestHandlerClass.log_message = lambda *a: None
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        print(f"Started local service at {url} ({args.workers} workers, queue {args.queue})")
+
+    try:
+        report = run_load_test(url, args.endpoint, payload, args.requests, args.concurrency)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            server.service.shutdown()
+
+    print(f"Endpoint:     /{args.endpoint}")
+    print(f"Requests:     {report['requests']} (concurrency {report['concurrency']})")
+    print(f"Wall time:    {report['wall_seconds']:.2f} s")
+    print(f"Succeeded:    {report['succeeded']} (rejected 503: {report['rejected']}, "
+          f"other failures: {report['failed']})")
+    print(f"Throughput:   {report['throughput_rps']:.2f} req/s (2xx only)")
+    if report['succeeded']:
+        print(f"Latency p50:  {report['p50_ms']:.1f} ms")
+        print(f"Latency p95:  {report['p95_ms']:.1f} ms")
+        print(f"Latency max:  {report['max_ms']:.1f} ms")
+    else:
+        print("Latency:      no successful responses")
+    print(f"Status codes: {report['status_counts']}")
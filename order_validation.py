@@ -0,0 +1,99 @@
+import pandas as pd
+
+# Tracking IDs shorter than this can appear inside unrelated label text,
+# so they are never used to match PDF pages
+MIN_TRACKING_ID_LENGTH = 5
+
+# Anything above this per order line is treated as a data entry error
+MAX_QUANTITY = 500
+
+MISSING_TRACKING_VALUES = ('', 'N/A', 'NAN', 'NONE')
+
+
+class OrderValidationError(ValueError):
+    """Raised by validate_orders(fail_fast=True) when the file has errors."""
+
+    def __init__(self, report):
+        self.report = report
+        super().__init__("; ".join(report['errors']))
+
+
+def validate_orders(df, max_quantity=MAX_QUANTITY, fail_fast=False):
+    """
+    Check a normalized order frame (from load_and_normalize_data) before rendering.
+
+    All checks are column-wise pandas operations, so large files are
+    validated in milliseconds.
+
+    Returns:
+        dict: Validation report. 'errors' and 'warnings' hold readable
+        messages; the remaining keys list the offending IDs.
+
+    Raises:
+        OrderValidationError: If fail_fast is set and any error was found.
+    """
+    report = {
+        'valid': True,
+        'errors': [],
+        'warnings': [],
+        'duplicate_tracking_ids': [],
+        'missing_tracking_orders': [],
+        'short_tracking_ids': [],
+        'invalid_quantity_orders': [],
+        'missing_sku_orders': [],
+    }
+
+    if df.empty:
+        report['warnings'].append("No valid order rows found")
+        return report
+
+    # Same normalization as label_sorter.normalize_text
+    tracking = df['tracking_id'].astype(str).str.replace('-', '', regex=False).str.replace(' ', '', regex=False)
+    missing_tracking = df['tracking_id'].isna() | tracking.str.upper().isin(MISSING_TRACKING_VALUES)
+    short_tracking = ~missing_tracking & (tracking.str.len() < MIN_TRACKING_ID_LENGTH)
+
+    quantity = pd.to_numeric(df['quantity'], errors='coerce')
+    invalid_quantity = quantity.isna() | (quantity <= 0) | (quantity > max_quantity) | (quantity % 1 != 0)
+
+    missing_sku = df['sku'].isna()
+
+    # Tracking IDs shared by more than one order
+    orders_per_tracking = df.loc[~missing_tracking, 'order_id'].groupby(tracking[~missing_tracking]).nunique()
+    duplicate_tracking = orders_per_tracking[orders_per_tracking > 1]
+
+    def unique_list(series):
+        return [str(v) for v in series.drop_duplicates().tolist()]
+
+    report['duplicate_tracking_ids'] = [str(v) for v in duplicate_tracking.index.tolist()]
+    report['missing_tracking_orders'] = unique_list(df.loc[missing_tracking, 'order_id'])
+    report['short_tracking_ids'] = unique_list(tracking[short_tracking])
+    report['invalid_quantity_orders'] = unique_list(df.loc[invalid_quantity, 'order_id'])
+    report['missing_sku_orders'] = unique_list(df.loc[missing_sku, 'order_id'])
+
+    if report['duplicate_tracking_ids']:
+        report['errors'].append(
+            f"{len(report['duplicate_tracking_ids'])} tracking IDs are shared by different orders"
+        )
+    if report['invalid_quantity_orders']:
+        report['errors'].append(
+            f"{len(report['invalid_quantity_orders'])} orders have a quantity that is not a whole number between 1 and {max_quantity}"
+        )
+    if report['short_tracking_ids']:
+        report['errors'].append(
+            f"{len(report['short_tracking_ids'])} tracking IDs are shorter than {MIN_TRACKING_ID_LENGTH} characters"
+        )
+    if report['missing_tracking_orders']:
+        report['warnings'].append(
+            f"{len(report['missing_tracking_orders'])} orders have no tracking ID (N/A)"
+        )
+    if report['missing_sku_orders']:
+        report['warnings'].append(
+            f"{len(report['missing_sku_orders'])} orders have rows with missing SKU"
+        )
+
+    report['valid'] = not report['errors']
+
+    if fail_fast and not report['valid']:
+        raise OrderValidationError(report)
+
+    return report
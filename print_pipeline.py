@@ -0,0 +1,225 @@
+"""
+Pipelined label printing.
+
+Renders labels in chunks and hands each finished chunk, as a standalone PDF,
+to a print sink while the next chunk is still being rendered, so the first
+labels come off the printer within seconds of starting a large batch.
+
+Sinks:
+    DirectorySink  writes numbered segment files to a folder watched by the
+                   print spooler (files appear atomically, in order)
+    SocketSink     sends each segment as a raw print job to a TCP endpoint
+                   (JetDirect / port 9100 style)
+
+SpoolServer is a local stand-in for a raw-socket printer that stores each
+received job in a folder, for testing without hardware.
+
+Usage:
+    python print_pipeline.py serve --port 9100 --out received/
+    python print_pipeline.py print "pedidos shein.xlsx" --socket 127.0.0.1:9100 --chunk 25
+    python print_pipeline.py print "pedidos shein.xlsx" --dir spool/ --chunk 25
+"""
+import argparse
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+import uuid
+
+from generate_labels import generate_labels_and_summary
+
+_DONE = object()
+
+
+class DirectorySink:
+    """
+    Write segments as <prefix>_00001.pdf, <prefix>_00002.pdf, ... in a spool folder.
+
+    The default prefix holds the start time plus a random part, so runs
+    started in the same second never overwrite each other's segments. An
+    explicit prefix that is already used in the folder is refused.
+    """
+
+    def __init__(self, directory, prefix=None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        if prefix is None:
+            prefix = f"{time.strftime('labels_%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        elif any(name.startswith(prefix + '_') for name in os.listdir(directory)):
+            raise ValueError(f"Segments with prefix '{prefix}' already exist in {directory}")
+        self.prefix = prefix
+
+    def send(self, sequence, data):
+        path = os.path.join(self.directory, f"{self.prefix}_{sequence:05d}.pdf")
+        # Write to a temporary name first so the spooler never picks up a partial file
+        tmp_path = path + '.part'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        pass
+
+
+class SocketSink:
+    """Send each segment as one raw print job (one TCP connection per job)."""
+
+    def __init__(self, host, port, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def send(self, sequence, data):
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as conn:
+            conn.sendall(data)
+            conn.shutdown(socket.SHUT_WR)
+            # Wait for the printer to close its side, i.e. the job was accepted,
+            # before the next segment is sent
+            while conn.recv(4096):
+                pass
+
+    def close(self):
+        pass
+
+
+class SegmentSpooler:
+    """
+    Deliver segments to a sink from a background thread.
+
+    Segments are sent strictly in the order they were put. At most
+    `max_pending` segments wait in memory; put() blocks when the sink falls
+    behind, which throttles rendering instead of buffering the whole batch.
+    """
+
+    def __init__(self, sink, max_pending=4):
+        self.sink = sink
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name='print-spooler', daemon=True)
+        self.started_at = time.perf_counter()
+        self.error = None
+        self.delivered = 0
+        self.first_delivery_seconds = None
+        self._thread.start()
+
+    def put(self, data):
+        if self.error is not None:
+            raise RuntimeError(f"Print sink failed: {self.error}")
+        self._queue.put(data)
+
+    def close(self):
+        """Wait until every queued segment was delivered."""
+        self._queue.put(_DONE)
+        self._thread.join()
+        self.sink.close()
+        if self.error is not None:
+            raise RuntimeError(f"Print sink failed: {self.error}")
+
+    def _run(self):
+        sequence = 0
+        while True:
+            data = self._queue.get()
+            if data is _DONE:
+                return
+            if self.error is not None:
+                # Keep draining so put() never blocks forever after a failure
+                continue
+            sequence += 1
+            try:
+                self.sink.send(sequence, data)
+            except Exception as e:
+                self.error = e
+                continue
+            self.delivered += 1
+            if self.first_delivery_seconds is None:
+                self.first_delivery_seconds = time.perf_counter() - self.started_at
+
+
+def print_labels_pipelined(input_file, sink, segment_size=25, max_pending=4, **kwargs):
+    """
+    Render labels for input_file and stream them to sink in segments of
+    segment_size orders. Extra kwargs are passed to generate_labels_and_summary.
+
+    Returns:
+        dict: generate_labels_and_summary stats plus 'segments_delivered',
+        'first_segment_seconds' and 'total_seconds'.
+    """
+    spooler = SegmentSpooler(sink, max_pending=max_pending)
+    try:
+        stats = generate_labels_and_summary(input_file, None, segment_callback=spooler.put,
+                                            segment_size=segment_size, **kwargs)
+    finally:
+        spooler.close()
+
+    stats['segments_delivered'] = spooler.delivered
+    stats['first_segment_seconds'] = spooler.first_delivery_seconds
+    stats['total_seconds'] = time.perf_counter() - spooler.started_at
+    return stats
+
+
+class _SpoolHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        data = self.rfile.read()
+        self.server.job_count += 1
+        path = os.path.join(self.server.out_dir, f"job_{self.server.job_count:05d}.pdf")
+        with open(path, 'wb') as f:
+            f.write(data)
+        print(f"[spool] received job {self.server.job_count} ({len(data)} bytes) -> {path}")
+
+
+class SpoolServer(socketserver.TCPServer):
+    """
+    Local stand-in for a raw-socket printer.
+
+    Jobs are handled one at a time, like a real printer, and stored as
+    job_00001.pdf, job_00002.pdf, ... in out_dir.
+    """
+
+    allow_reuse_address = True
+
+    def __init__(self, out_dir, host='127.0.0.1', port=9100):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.job_count = 0
+        super().__init__((host, port), _SpoolHandler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipelined label printing")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    print_cmd = commands.add_parser('print', help="Render an orders file and stream it to a print sink")
+    print_cmd.add_argument('excel', help="Orders Excel file")
+    target = print_cmd.add_mutually_exclusive_group(required=True)
+    target.add_argument('--dir', help="Spool folder to write segments to")
+    target.add_argument('--socket', help="Raw print endpoint as host:port")
+    print_cmd.add_argument('--chunk', type=int, default=25, help="Orders per segment")
+    print_cmd.add_argument('--max-pending', type=int, default=4, help="Segments buffered before rendering waits")
+
+    serve_cmd = commands.add_parser('serve', help="Run a local stand-in raw-socket printer")
+    serve_cmd.add_argument('--host', default='127.0.0.1')
+    serve_cmd.add_argument('--port', type=int, default=9100)
+    serve_cmd.add_argument('--out', default='received_jobs', help="Folder for received jobs")
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        server = SpoolServer(args.out, args.host, args.port)
+        print(f"Stand-in printer listening on {args.host}:{args.port}, saving jobs to {args.out}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    else:
+        if args.dir:
+            sink = DirectorySink(args.dir)
+        else:
+            host, port = args.socket.rsplit(':', 1)
+            sink = SocketSink(host, int(port))
+        stats = print_labels_pipelined(args.excel, sink, segment_size=args.chunk,
+                                       max_pending=args.max_pending)
+        print(f"Delivered {stats['segments_delivered']} segments for {stats['unique_orders']} orders "
+              f"in {stats['total_seconds']:.2f} s (first segment after {stats['first_segment_seconds']:.2f} s)")
@@ -0,0 +1,114 @@
+"""
+Content-addressed cache of finished PDFs.
+
+Results are keyed by a hash of the input bytes, the options and the source
+code of the processing modules, so an identical request is served without
+recomputation and any code change invalidates old entries. LRUCache holds
+them bounded by total size, evicting the least recently used results first;
+the HTTP service uses the same class for its parse and extraction caches.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Modules whose source defines the output; part of every key
+CODE_FILES = ('generate_labels.py', 'label_sorter.py', 'order_validation.py')
+
+_code_version = None
+
+
+def code_version():
+    """Hash of CODE_FILES, computed once per process."""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in CODE_FILES:
+            with open(os.path.join(here, name), 'rb') as f:
+                digest.update(f.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def make_key(kind, *inputs, **options):
+    """
+    Build a cache key from the operation name, input file bytes and options.
+
+    Example: make_key('sort', excel_bytes, pdf_bytes)
+    """
+    digest = hashlib.sha256()
+    for part in (kind.encode('utf-8'), code_version().encode('ascii'),
+                 json.dumps(options, sort_keys=True, default=str).encode('utf-8'), *inputs):
+        # Length prefix so parts cannot run into each other
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def result_size(value):
+    """Approximate size of a cached (pdf_bytes, stats) result."""
+    pdf_bytes, stats = value
+    return len(pdf_bytes or b'') + len(repr(stats))
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache, bounded by entry count and/or total size.
+
+    Entries are weighed with `size(value)` when max_bytes is set, e.g.
+    LRUCache(max_bytes=256 * 1024 * 1024, size=result_size) for finished PDFs
+    or LRUCache(max_items=32) for parsed inputs.
+    """
+
+    def __init__(self, max_items=None, max_bytes=None, size=None):
+        if max_bytes is not None and size is None:
+            raise ValueError("max_bytes needs a size function")
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.size = size
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached value or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.size(value) if self.size is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            while ((self.max_items is not None and len(self._entries) > self.max_items)
+                   or (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            # Compute outside the lock so other callers are not blocked
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def info(self):
+        with self._lock:
+            return {'items': len(self._entries), 'bytes': self.total_bytes,
+                    'max_items': self.max_items, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,112 @@
+"""
+Cold start benchmark for the Streamlit app.
+
+Measures, each in a fresh interpreter:
+  - import time of the app's dependencies and of our own modules
+  - first render of app.py (no file uploaded), and which heavy modules
+    were imported by the time the page was rendered
+
+Usage:
+    python startup_benchmark.py
+    python startup_benchmark.py --budget-ms 1500   # exit 1 if first render is slower
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+MODULES = [
+    'streamlit',
+    'pandas',
+    'reportlab.pdfgen.canvas',
+    'PyPDF2',
+    'generate_labels',
+    'label_sorter',
+]
+
+# Modules the first paint should not need
+HEAVY_MODULES = ['pandas', 'reportlab', 'PyPDF2']
+
+IMPORT_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print((time.perf_counter() - start) * 1000)
+"""
+
+RENDER_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+import_ms = (time.perf_counter() - start) * 1000
+
+app = AppTest.from_file("app.py", default_timeout=60)
+start = time.perf_counter()
+app.run()
+render_ms = (time.perf_counter() - start) * 1000
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"streamlit_import_ms": import_ms, "first_render_ms": render_ms,
+                  "errors": [str(e.value) for e in app.exception], "heavy_loaded": loaded}}))
+"""
+
+
+def run_python(code, env=None):
+    result = subprocess.run([sys.executable, '-c', code], cwd=HERE, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else 'failed')
+    return result.stdout.strip().splitlines()[-1]
+
+
+def measure_imports(repeat):
+    timings = {}
+    for module in MODULES:
+        try:
+            runs = [float(run_python(IMPORT_SNIPPET.format(module=module))) for _ in range(repeat)]
+            timings[module] = min(runs)
+        except RuntimeError as e:
+            timings[module] = f"error: {e}"
+    return timings
+
+
+def measure_first_render():
+    # Disable the background preload so the measurement only shows what the
+    # first paint itself imported
+    env = dict(os.environ, LABEL_APP_SKIP_PRELOAD='1')
+    return json.loads(run_python(RENDER_SNIPPET.format(heavy=HEAVY_MODULES), env=env))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start benchmark for app.py")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per import (best is reported)")
+    parser.add_argument('--budget-ms', type=float, help="Fail if the first render is slower than this")
+    args = parser.parse_args()
+
+    print("Import time (fresh interpreter, best of %d):" % args.repeat)
+    for module, value in measure_imports(args.repeat).items():
+        if isinstance(value, float):
+            print(f"  {module:<26} {value:8.1f} ms")
+        else:
+            print(f"  {module:<26} {value}")
+
+    render = measure_first_render()
+    print("\nFirst render of app.py (no upload):")
+    print(f"  streamlit testing import   {render['streamlit_import_ms']:8.1f} ms")
+    print(f"  script run                 {render['first_render_ms']:8.1f} ms")
+    print(f"  heavy modules loaded       {', '.join(render['heavy_loaded']) or 'none'}")
+
+    failed = False
+    if render['errors']:
+        print(f"  errors: {render['errors']}")
+        failed = True
+    if render['heavy_loaded']:
+        print("  REGRESSION: first paint imported heavy modules")
+        failed = True
+    if args.budget_ms is not None and render['first_render_ms'] > args.budget_ms:
+        print(f"  REGRESSION: first render exceeded budget of {args.budget_ms:.0f} ms")
+        failed = True
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,156 @@
+"""
+Combined TikTok processing: label sorting and picking list in parallel.
+
+The orders Excel is parsed once and shared by both steps. Sorting (PDF text
+extraction) runs in a worker process while the picking list / labels are
+rendered in the calling process, so the wall-clock time is roughly the
+longer of the two instead of their sum. Both steps are pure Python, so a
+thread would not run them in parallel. On a single CPU the steps run one
+after the other, since a worker process would only add overhead.
+
+The worker is started with 'spawn': forking the multi-threaded Streamlit
+server could copy a lock held by another thread and hang the child. Spawning
+costs about a second, so the app starts it early with warm_up_pool().
+
+If the worker dies, or still has not answered after a hang guard scaled to
+the number of orders, it is replaced and the sort runs in the calling
+process instead.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from generate_labels import generate_labels_and_summary, load_and_normalize_data
+from label_sorter import sort_labels
+
+# Hang guard for the worker, counted from when the picking list is done.
+# Far above real sorting times (tens of ms per label), so it only fires
+# when the worker is stuck.
+SORT_TIMEOUT_BASE_SECONDS = 120
+SORT_TIMEOUT_PER_ORDER_SECONDS = 0.5
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _get_pool():
+    """Single worker process kept alive between runs to avoid start-up cost."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _reset_pool(terminate=False):
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            if terminate:
+                # shutdown() never stops a hung worker and ProcessPoolExecutor has
+                # no public API to terminate one (Python 3.14 adds
+                # terminate_workers()). This relies on the private _processes
+                # dict (pid -> Process); if it is missing the worker is left to
+                # exit on its own.
+                for process in list((getattr(_pool, '_processes', None) or {}).values()):
+                    process.terminate()
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _ping():
+    return os.getpid()
+
+
+def warm_up_pool():
+    """
+    Start the worker process (and its imports) in the background, so the
+    first combined run does not pay the spawn start-up. No-op on one CPU.
+    """
+    if _available_cpus() > 1:
+        _get_pool().submit(_ping)
+
+
+def sort_timeout_for(order_count):
+    """Hang guard in seconds for sorting the labels of order_count orders."""
+    return SORT_TIMEOUT_BASE_SECONDS + SORT_TIMEOUT_PER_ORDER_SECONDS * order_count
+
+
+def process_tiktok_orders(excel_path, pdf_path, sorted_output_path, summary_output_path,
+                          data=None, include_labels=True, parallel=None, sort_timeout=None):
+    """
+    Sort the TikTok labels PDF and generate the picking list concurrently.
+
+    Args:
+        excel_path: Orders Excel file.
+        pdf_path: Unordered TikTok labels PDF.
+        sorted_output_path: Where the sorted labels PDF is written.
+        summary_output_path: Where the labels + picking list PDF is written.
+        data: Optional (DataFrame, stats) from load_and_normalize_data.
+        include_labels: Passed to generate_labels_and_summary.
+        parallel: Run sorting in a worker process. Defaults to True when
+            more than one CPU is available.
+        sort_timeout: Seconds to wait for the worker after the picking list
+            is done before sorting in this process instead. Defaults to
+            sort_timeout_for() the number of Excel rows.
+
+    Returns:
+        dict: 'sort_stats' (as returned by sort_labels), 'summary_stats'
+        (generate_labels_and_summary stats, or None if it failed),
+        'summary_error' (None or the error message), 'parallel' and 'wall_seconds'.
+    """
+    start = time.perf_counter()
+
+    # Parse once for both steps; let format errors propagate to the UI
+    if data is None:
+        data = load_and_normalize_data(excel_path)
+
+    if parallel is None:
+        parallel = _available_cpus() > 1
+
+    result = {
+        'sort_stats': None,
+        'summary_stats': None,
+        'summary_error': None,
+        'parallel': parallel,
+        'wall_seconds': 0.0,
+    }
+
+    if parallel:
+        sort_future = _get_pool().submit(sort_labels, excel_path, pdf_path, sorted_output_path, data=data)
+    else:
+        result['sort_stats'] = sort_labels(excel_path, pdf_path, sorted_output_path, data=data)
+
+    try:
+        result['summary_stats'] = generate_labels_and_summary(excel_path, summary_output_path, data=data,
+                                                              include_labels=include_labels)
+    except Exception as e:
+        result['summary_error'] = str(e)
+
+    if parallel:
+        if sort_timeout is None:
+            sort_timeout = sort_timeout_for(len(data[0]))
+        try:
+            result['sort_stats'] = sort_future.result(timeout=sort_timeout)
+        except (TimeoutError, BrokenProcessPool) as e:
+            # The worker hung or died (e.g. it was killed); replace it and sort here
+            reason = f"did not finish within {sort_timeout:.0f} s" if isinstance(e, TimeoutError) else "died"
+            print(f"Sorting worker {reason}; sorting in this process")
+            _reset_pool(terminate=True)
+            result['sort_stats'] = sort_labels(excel_path, pdf_path, sorted_output_path, data=data)
+        except Exception as e:
+            # sort_labels itself raised in the worker; it would raise here too
+            result['sort_stats'] = {'success': False, 'error': f"Error sorting labels: {e}"}
+
+    result['wall_seconds'] = time.perf_counter() - start
+    return result